@@ -0,0 +1,208 @@
+"""Regression tests for multicloud-cost-anomaly-detector.py (run with pytest from this directory)"""
+
+import importlib.util
+import os
+import sys
+
+import numpy as np
+import pytest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'multicloud-cost-anomaly-detector.py')
+
+
+def _load_script():
+    # The script name is not a valid module name, so it is imported by path
+    spec = importlib.util.spec_from_file_location('multicloud_cost_anomaly_detector', SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+detector_module = _load_script()
+
+
+def _detector(costs, start='2024-01-01'):
+    dates = (np.datetime64(start) + np.arange(len(costs))).astype(str).tolist()
+    detector = detector_module.CostAnomalyDetector()
+    detector.historical_data = {'dates': dates, 'aws': list(costs)}
+    return detector
+
+
+def _assert_same_records(loop, vectorized):
+    assert len(loop) == len(vectorized)
+    for expected, actual in zip(loop, vectorized):
+        assert actual.keys() == expected.keys()
+        for key in ('date', 'anomaly_type', 'severity'):
+            assert actual[key] == expected[key]
+        for key in ('cost', 'expected_cost', 'z_score', 'deviation_percent'):
+            assert float(actual[key]) == pytest.approx(float(expected[key]), rel=1e-9, abs=1e-9, nan_ok=True)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_statistical_engines_match_on_sample_data(seed):
+    np.random.seed(seed)
+    detector = detector_module.CostAnomalyDetector()
+    detector._generate_sample_data()
+    for provider in detector.providers():
+        _assert_same_records(
+            detector.detect_statistical_anomalies(provider, engine='loop'),
+            detector.detect_statistical_anomalies(provider, engine='vectorized')
+        )
+
+
+@pytest.mark.parametrize('costs', [
+    # Shorter than the window: every rolling value is NaN, so only IQR can flag
+    [100.0, 101.0, 99.0, 100.0, 102.0, 500.0, 98.0, 100.0, 101.0, 99.0],
+    # Constant costs: zero spread, nothing to flag
+    [250.0] * 60,
+    # Spikes inside the NaN rolling edges at both ends of the series
+    [900.0, 100.0, 101.0] + [100.0 + (day % 7) for day in range(84)] + [99.0, 5.0, 950.0],
+    # A single day
+    [100.0],
+])
+def test_statistical_engines_match_on_edge_cases(costs):
+    detector = _detector(costs)
+    _assert_same_records(
+        detector.detect_statistical_anomalies('aws', engine='loop'),
+        detector.detect_statistical_anomalies('aws', engine='vectorized')
+    )
+
+
+def test_statistical_engines_match_with_short_window():
+    rng = np.random.default_rng(7)
+    costs = 100 + rng.normal(0, 5, 120)
+    costs[[3, 40, 41, 117]] = [300.0, 20.0, 260.0, 310.0]
+    detector = _detector(costs)
+    _assert_same_records(
+        detector.detect_statistical_anomalies('aws', window_days=7, engine='loop'),
+        detector.detect_statistical_anomalies('aws', window_days=7, engine='vectorized')
+    )
+
+
+def test_unknown_statistical_engine_is_rejected():
+    with pytest.raises(ValueError):
+        _detector([100.0] * 10).detect_statistical_anomalies('aws', engine='gpu')
+
+
+def test_ingest_accepts_naive_and_offset_aware_timestamps():
+    detector = detector_module.CostAnomalyDetector()
+    detector.ingest('s', '2024-01-01', 100.0)
+    detector.ingest('s', '2024-01-02T00:00:00Z', 100.0)
+    detector.ingest('s', '2024-01-03T02:00:00+02:00', 100.0)
+    detector.ingest('s', int(np.datetime64('2024-01-04', 's').astype(np.int64)), 100.0)
+    state = detector.stream_state['s']
+    assert state.last_timestamp == detector_module.datetime(2024, 1, 4)
+    assert state.last_timestamp.tzinfo is None
+    # The same instant written with an offset is a replay, not a new point
+    assert detector.ingest('s', '2024-01-04T01:00:00+01:00', 500.0) == []
+
+
+def test_state_store_watermark_is_utc_for_offset_timestamps(tmp_path):
+    detector = detector_module.CostAnomalyDetector()
+    detector.ingest('s', '2024-01-02T02:00:00+02:00', 100.0)
+    with detector_module.AnomalyStateStore(str(tmp_path / 'state.db')) as store:
+        store.save_states(detector.stream_state)
+        watermark = store.watermarks()['s']
+    assert watermark == int(np.datetime64('2024-01-02T00:00:00', 's').astype(np.int64))
+
+
+def test_model_store_reuses_model_for_rolled_window(tmp_path):
+    from sklearn.ensemble import IsolationForest
+    
+    rng = np.random.default_rng(3)
+    costs = 100 + rng.normal(0, 5, 110)
+    dates = (np.datetime64('2024-01-01') + np.arange(len(costs))).astype(str).tolist()
+    store = detector_module.IsolationForestModelStore(str(tmp_path), refit_after=7)
+    template = IsolationForest(n_estimators=20, random_state=0)
+    # A fixed 90-day window rolled one day at a time, featurized per window as the detector does
+    for start in range(10):
+        window = slice(start, start + 90)
+        features = detector_module.build_feature_matrix(costs[window].reshape(1, -1))[0]
+        store.get_model('s', features, template, dates[window])
+    assert store.stats['hits'] == 8
+    assert store.stats['misses'] == 2
+
+
+def test_model_store_refits_when_dates_move_without_costs(tmp_path):
+    from sklearn.ensemble import IsolationForest
+    
+    costs = np.full((1, 60), 100.0)
+    features = detector_module.build_feature_matrix(costs)[0]
+    dates = (np.datetime64('2024-01-01') + np.arange(60)).astype(str).tolist()
+    later = (np.datetime64('2024-06-01') + np.arange(60)).astype(str).tolist()
+    store = detector_module.IsolationForestModelStore(str(tmp_path), refit_after=7)
+    template = IsolationForest(n_estimators=20, random_state=0)
+    store.get_model('s', features, template, dates)
+    store.get_model('s', features, template, dates)
+    store.get_model('s', features, template, later)
+    assert store.stats['hits'] == 1
+    assert store.stats['misses'] == 2
+
+
+@pytest.mark.parametrize('vectorize_from', [1, 10 ** 9])
+@pytest.mark.parametrize('window', [1, 2, 7, 30])
+def test_rolling_median_mad_matches_direct_median(window, vectorize_from):
+    rng = np.random.default_rng(window)
+    costs = np.round(100 + rng.normal(0, 5, (5, 80)), 1)
+    costs[:, 20:30] = 100.0
+    median, mad = detector_module._rolling_median_mad(costs, window, vectorize_from=vectorize_from)
+    min_periods = max(1, window // 2)
+    for day in range(costs.shape[1]):
+        history = costs[:, max(0, day - window):day]
+        if history.shape[1] < min_periods:
+            assert np.isnan(median[:, day]).all() and np.isnan(mad[:, day]).all()
+            continue
+        expected = np.median(history, axis=1)
+        np.testing.assert_allclose(median[:, day], expected, rtol=0, atol=1e-12)
+        np.testing.assert_allclose(mad[:, day], np.median(np.abs(history - expected[:, None]), axis=1),
+                                   rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('n_days', [400, 1400])
+def test_incremental_run_scores_a_bounded_tail(tmp_path, n_days):
+    rng = np.random.default_rng(0)
+    costs = 1000 + rng.normal(0, 50, n_days)
+    costs[-1] *= 3
+    dates = (np.datetime64('2020-01-01') + np.arange(n_days)).astype(str).tolist()
+    with detector_module.AnomalyStateStore(str(tmp_path / 'state.db')) as store:
+        detector = detector_module.CostAnomalyDetector()
+        detector.historical_data = {'dates': dates[:-1], 'aws': costs[:-1].tolist()}
+        detector.run_incremental(store)
+        
+        detector = detector_module.CostAnomalyDetector()
+        detector.historical_data = {'dates': dates, 'aws': costs.tolist()}
+        widths = []
+        robust_batch = detector.detect_robust_anomalies_batch
+        detector.detect_robust_anomalies_batch = lambda values, *args, **kwargs: (
+            widths.append(np.shape(values)[-1]) or robust_batch(values, *args, **kwargs))
+        results = detector.run_incremental(store)
+    
+    # One new day plus the 90-day baseline, whatever the history length
+    assert widths == [91]
+    assert [anomaly['date'] for anomaly in results['aws']] == [dates[-1]]
+
+
+def test_report_streams_each_series_to_the_exporter(tmp_path):
+    import json
+    
+    np.random.seed(0)
+    detector = detector_module.CostAnomalyDetector()
+    detector._generate_sample_data()
+    providers = detector.providers()
+    written = []
+    path = str(tmp_path / 'anomalies.ndjson')
+    with detector_module.AnomalyExporter(path) as exporter:
+        write = exporter.write
+        # Nothing may stay memoized once a series has been written
+        exporter.write = lambda series_id, results: (
+            written.append((series_id, dict(detector._results_cache))) or write(series_id, results))
+        report = detector.generate_anomaly_report(providers, exporter=exporter)
+    
+    assert [series_id for series_id, _ in written] == providers
+    assert all(set(cached) == {series_id} for series_id, cached in written)
+    assert detector._results_cache == {}
+    with open(path) as f:
+        rows = [json.loads(line) for line in f]
+    assert len(rows) == exporter.rows_written > 0
+    assert f"Total Anomalies Detected: {len(rows)}" in report